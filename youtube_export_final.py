@@ -8,19 +8,52 @@ YouTube Studio 批量导出工具
 3. 设置好时间范围和筛选条件
 4. 运行此脚本
 
+无人值守（BROWSER_MODE = "launch"）：
+- 脚本用自己的配置目录（chromium_profile）启动无头 Chromium，直接打开 START_URL，不需要手动确认
+- 登录方式二选一：
+  a. 在已登录的 Chrome 上运行 `--save-login` 导出 youtube_login.json，拷到服务器，未登录时自动导入
+  b. 在服务器上设置 HEADLESS = False 运行一次，在弹出的窗口里登录
+
 导出逻辑：
 - 每次勾选最多 12 个视频 → 导出 → 取消勾选 → 滚动 → 重复
 - Table data: 用第一次（包含所有视频汇总）
 - Chart data: 拼接所有（每批视频的详细数据）
 - Totals: 用第一次
+- 对账：对比第一次的 Table data 与所有 Chart data，按视频 ID 只补导出缺失的视频
+
+时间分片（SHARD_URL_TEMPLATE 非空时）：
+- 把时间范围拆成多个窗口，每个窗口单独导出到 shard_开始_结束/，可多标签页并发
+- 合并时 Chart data 按窗口日期顺序拼接
+
+缓存（CACHE_ENABLED，默认关闭）：
+- 批次按上次导出的 Table data 中的视频顺序固定分组，按 ID 勾选；
+  各批次在表格里从上到下排列，一次向下滚动就能勾选完所有批次
+- 每批 ZIP 按 视图链接 + 报表 + 视频 ID 缓存，完整的合并结果按 视图链接 + 报表 + 视频列表 缓存
+- 有效期内重复导出直接使用缓存，只有过期或缺失的批次才会操作浏览器
+
+守护进程（python youtube_export_final.py --daemon）：
+- 保持浏览器连接，通过本地 HTTP 接口（DAEMON_PORT）排队执行导出 / 合并任务
+- 启用缓存时，各视图的视频 ID 列表保存在内存中，连续任务直接按 ID 分批，不需要重新获取
+
+多报表模式（REPORT_TABS 非空时）：
+- 每批视频勾选一次，依次切换各报表标签并分别导出
+- 每个报表单独下载到 downloads/<报表名>/，单独合并
 """
 
 import asyncio
 import csv
+import hashlib
+import json
 import os
+import re
+import shutil
 import sys
+import threading
+import time
+import uuid
 import zipfile
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 try:
     from playwright.async_api import async_playwright, Page
@@ -31,14 +64,137 @@ except ImportError:
 
 
 # ==================== 配置 ====================
+# 浏览器模式：
+#   "cdp"    连接 start_chrome.bat 手动启动的 Chrome
+#   "launch" 由脚本自己启动并持有浏览器（可无头运行，适合 Linux 服务器无人值守）
+BROWSER_MODE = "cdp"
 CHROME_DEBUG_PORT = 9222
+# launch 模式设置
+# 注意：不能直接用 Windows 上的 chrome_debug_profile（Cookie 用 Windows 专用密钥加密，换系统无法解密）
+CHROME_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chromium_profile")
+# 可移植的登录状态（Cookie），用 --save-login 从已登录的 Chrome 导出，launch 时发现未登录才导入
+LOGIN_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "youtube_login.json")
+HEADLESS = True
+BROWSER_CHANNEL = None  # None 用 Playwright 自带 Chromium；"chrome" 用本机 Chrome
+START_URL = "https://studio.youtube.com/"  # 可填高级模式完整链接（含时间范围和筛选条件）
+RELAUNCH_ATTEMPTS = 3
 OUTPUT_DIR = "youtube_exports"
 DOWNLOADS_DIR = os.path.join(OUTPUT_DIR, "downloads")
 MAX_VIDEOS_PER_EXPORT = 5  # 每次5个，更加稳健
 MAX_EXPORT_ROUNDS = 100
+EXPORT_TIMEOUT_MS = 30000  # 单次下载超时
+
+# 对账补导出：主循环结束后，对比 Table data 与所有 Chart data，
+# 只补导出缺失的视频，最多补 N 轮（0 表示关闭）
+RECONCILE_ROUNDS = 2
+
+# 多报表模式：填写高级模式里的报表标签名，如 ['视频', '流量来源', '地理位置']
+# 第一个标签需能看到视频列表（用于勾选）；留空则只导出当前视图
+REPORT_TABS = []
+
+# 时间分片：长时间范围拆成多个窗口分别导出，避免单个 ZIP 过大导致下载超时
+# SHARD_URL_TEMPLATE 填高级模式链接，把其中的时间范围替换为占位符：
+#   {start} / {end}         日期 YYYY-MM-DD（结束日期包含在内）
+#   {start_ms} / {end_ms}   毫秒时间戳（UTC）：开始日 00:00，结束日次日 00:00（不含），
+#                           即 [start_ms, end_ms) 覆盖整个结束日
+# 留空则不分片
+SHARD_URL_TEMPLATE = ""
+SHARD_START = "2020-01-01"
+SHARD_END = ""          # 留空为今天
+SHARD_DAYS = 90         # 每个窗口的天数
+SHARD_CONCURRENCY = 1   # >1 时在多个标签页同时导出不同窗口
+
+# 查询结果缓存（默认关闭）：相同视图（链接、报表、分片设置）在有效期内重复导出时，
+# 直接使用本地保存的完整合并结果；否则只有过期或缺失的批次才会在浏览器里导出。
+# 启用后批次按 Table data 中的视频顺序固定分组，按视频 ID 勾选
+CACHE_ENABLED = False
+CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 超过后先删最旧的
+
+# 守护进程模式（python youtube_export_final.py --daemon）：
+# 保持浏览器连接，通过本地 HTTP 接口排队执行任务
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+DAEMON_MAX_FINISHED_JOBS = 100  # 只保留最近 N 个已结束的任务记录，避免长时间运行时内存一直增长
 # ==============================================
 
 
+def split_date_range(start: str, end: str = "", days: int = SHARD_DAYS) -> list:
+    """把 [start, end] 拆成若干个不超过 days 天的窗口，返回 [(开始, 结束), ...]（含首尾）"""
+    if days < 1:
+        raise ValueError(f"SHARD_DAYS 必须 >= 1，当前为 {days}")
+    start_date = datetime.strptime(start, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else date.today()
+    if start_date > end_date:
+        raise ValueError(f"时间分片起始日期 {start_date} 晚于结束日期 {end_date}")
+    
+    windows = []
+    while start_date <= end_date:
+        window_end = min(start_date + timedelta(days=days - 1), end_date)
+        windows.append((start_date, window_end))
+        start_date = window_end + timedelta(days=1)
+    return windows
+
+
+def shard_name(start: date, end: date) -> str:
+    """时间窗口的目录名，按名字排序即按日期排序"""
+    return f"shard_{start:%Y%m%d}_{end:%Y%m%d}"
+
+
+def shard_label(shard: str) -> str:
+    """shard_20240101_20240331 → 20240101-20240331"""
+    return shard[len('shard_'):].replace('_', '-')
+
+
+def shard_url(start: date, end: date) -> str:
+    """
+    用 SHARD_URL_TEMPLATE 生成某个时间窗口 [start, end]（含结束日）的高级模式链接
+    毫秒时间戳按 UTC 计算，end_ms 是结束日次日 00:00（不含），否则会漏掉结束日当天
+    """
+    def to_ms(d: date) -> int:
+        return int(datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp() * 1000)
+    
+    return SHARD_URL_TEMPLATE.format(
+        start=start.isoformat(), end=end.isoformat(),
+        start_ms=to_ms(start), end_ms=to_ms(end + timedelta(days=1)),
+    )
+
+
+def safe_name(name: str) -> str:
+    """把报表名转成可用的文件夹名"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', name).strip('_') or 'report'
+
+
+def report_download_dir(report: str = None, shard: str = None) -> str:
+    """返回下载目录：DOWNLOADS_DIR[/报表名][/时间窗口]"""
+    path = DOWNLOADS_DIR
+    if report:
+        path = os.path.join(path, safe_name(report))
+    if shard:
+        path = os.path.join(path, shard)
+    return path
+
+
+def new_merged_dir() -> str:
+    """创建并返回新的 merged_时间戳 输出目录，同一秒内多次合并时加序号"""
+    base = os.path.join(OUTPUT_DIR, f"merged_{datetime.now():%Y%m%d_%H%M%S}")
+    path, n = base, 1
+    while True:
+        try:
+            os.makedirs(path)
+            return path
+        except FileExistsError:
+            n += 1
+            path = f"{base}_{n}"
+
+
+def clear_downloads():
+    """清空旧的下载（包括各报表子目录）"""
+    if os.path.exists(DOWNLOADS_DIR):
+        shutil.rmtree(DOWNLOADS_DIR, ignore_errors=True)
+
+
 def get_videos_from_zip(filepath: str) -> list:
     """从 ZIP 文件中读取 Chart data，返回视频名字列表"""
     try:
@@ -62,20 +218,208 @@ def get_videos_from_zip(filepath: str) -> list:
     return []
 
 
+class ExportCache:
+    """
+    本地导出缓存
+    - batches/<key>.zip: 每批视频在某个视图下导出的 ZIP
+    - merged/<key>/: 一次完整任务的合并结果
+    按修改时间判断是否过期（CACHE_TTL_SECONDS），总大小超过 CACHE_MAX_BYTES 时删除最旧的
+    """
+    
+    def __init__(self, cache_dir: str = CACHE_DIR, ttl: int = CACHE_TTL_SECONDS,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(*parts) -> str:
+        """把视图参数和视频列表转成缓存键"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def _is_fresh(self, path: str) -> bool:
+        return os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl
+    
+    def get_batch(self, key: str) -> str:
+        """返回未过期的批次 ZIP 路径，没有则返回 None"""
+        path = os.path.join(self.cache_dir, "batches", f"{key}.zip")
+        if self._is_fresh(path):
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+    
+    def put_batch(self, key: str, filepath: str):
+        os.makedirs(os.path.join(self.cache_dir, "batches"), exist_ok=True)
+        shutil.copyfile(filepath, os.path.join(self.cache_dir, "batches", f"{key}.zip"))
+    
+    def has_batch(self, key: str) -> bool:
+        """是否有未过期的批次 ZIP（不计入命中统计）"""
+        return self._is_fresh(os.path.join(self.cache_dir, "batches", f"{key}.zip"))
+    
+    def get_merged(self, key: str) -> str:
+        """返回未过期的合并结果目录，没有则返回 None"""
+        path = os.path.join(self.cache_dir, "merged", key)
+        if self._is_fresh(path):
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+    
+    def put_merged(self, key: str, merged_dir: str):
+        path = os.path.join(self.cache_dir, "merged", key)
+        shutil.rmtree(path, ignore_errors=True)
+        shutil.copytree(merged_dir, path)
+    
+    def get_index(self, view_url: str) -> dict:
+        """
+        返回某个视图上次导出的视频列表，没有或已过期返回 None
+        {'videos': {视频ID: 标题}（Table data 顺序）, 'no_chart': [没有 Chart data 的视频ID]}
+        """
+        path = os.path.join(self.cache_dir, "index", f"{self.make_key('index', view_url)}.json")
+        if not self._is_fresh(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def put_index(self, view_url: str, videos: dict, no_chart: set = None):
+        os.makedirs(os.path.join(self.cache_dir, "index"), exist_ok=True)
+        path = os.path.join(self.cache_dir, "index", f"{self.make_key('index', view_url)}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'videos': videos, 'no_chart': sorted(no_chart or [])}, f, ensure_ascii=False)
+    
+    def evict(self):
+        """删除过期条目，再按从旧到新删除，直到总大小不超过上限"""
+        entries = []  # (修改时间, 大小, 路径)
+        for sub in ("batches", "merged", "index"):
+            sub_dir = os.path.join(self.cache_dir, sub)
+            if not os.path.exists(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                path = os.path.join(sub_dir, name)
+                if os.path.isdir(path):
+                    size = sum(
+                        os.path.getsize(os.path.join(root, f))
+                        for root, _, files in os.walk(path) for f in files
+                    )
+                else:
+                    size = os.path.getsize(path)
+                entries.append((os.path.getmtime(path), size, path))
+        
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if time.time() - mtime < self.ttl and total <= self.max_bytes:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            total -= size
+            removed += 1
+        
+        if removed:
+            print(f"   🧹 缓存清理: 删除 {removed} 个条目")
+
+
+def read_zip_csv(filepath: str, keywords: list) -> list:
+    """读取 ZIP 中文件名包含任一关键字的第一个 CSV，返回行列表"""
+    try:
+        with zipfile.ZipFile(filepath, 'r') as zf:
+            for name in zf.namelist():
+                if any(k in name for k in keywords):
+                    with zf.open(name) as f:
+                        content = f.read().decode('utf-8-sig')
+                        return list(csv.DictReader(content.strip().split('\n')))
+    except Exception as e:
+        print(f"      读取 ZIP 失败: {e}")
+    return []
+
+
+def get_video_id(row: dict) -> str:
+    """从 CSV 行中取视频 ID（内容 列），合计行返回空"""
+    for col in ['内容', 'Content', 'Video ID', '视频 ID']:
+        value = (row.get(col) or '').strip()
+        if value:
+            return '' if value in ('合计', '总计', 'Total') else value
+    return ''
+
+
+def get_table_videos(filepath: str) -> dict:
+    """从 ZIP 的 Table data 读取完整视频列表 {视频ID: 标题}"""
+    videos = {}
+    for row in read_zip_csv(filepath, ['表格', 'Table']):
+        video_id = get_video_id(row)
+        if video_id:
+            videos[video_id] = (row.get('视频标题') or row.get('Video title') or '').strip()
+    return videos
+
+
+def get_chart_video_ids(filepath: str) -> set:
+    """从 ZIP 的 Chart data 读取包含的视频 ID"""
+    return {get_video_id(row) for row in read_zip_csv(filepath, ['图表', 'Chart', 'chart'])} - {''}
+
+
+def find_missing_videos(download_dir: str, ignore: set = None) -> dict:
+    """
+    对账：第一个 ZIP 的 Table data 是完整视频列表，
+    返回其中没有出现在任何 Chart data 里的视频 {视频ID: 标题}
+    ignore: 已确认没有 Chart data 的视频 ID，不算缺失
+    """
+    if not os.path.exists(download_dir):
+        return {}
+    zip_files = sorted([f for f in os.listdir(download_dir) if f.endswith('.zip')])
+    if not zip_files:
+        return {}
+    
+    all_videos = get_table_videos(os.path.join(download_dir, zip_files[0]))
+    
+    charted = set()
+    for filename in zip_files:
+        charted |= get_chart_video_ids(os.path.join(download_dir, filename))
+    
+    ignore = ignore or set()
+    return {vid: title for vid, title in all_videos.items() if vid not in charted and vid not in ignore}
+
+
 class YouTubeExporter:
     def __init__(self):
         self.page: Page = None
         self.playwright = None
         self.browser = None
-        self.exported_count = 0
+        self.context = None  # launch 模式下持有的持久化上下文
+        self.needs_login = False  # launch 时发现未登录，重试无意义
+        self.shard = None    # 当前导出的时间窗口（分片模式）
+        self.cache = None    # ExportCache，为空时不使用缓存
+        self.view_url = None # 本次导出的视图链接（缓存键的一部分）
+        self.active_report = None  # 当前所在的报表标签，None 表示未知（刚打开页面）
+        self.video_index = {}  # 视图链接 -> (保存时间, {视频ID: 标题}, 没有 Chart data 的视频ID)，内存中的视频列表
+        self.exported_count = 0   # 下载目录中的文件序号（含缓存复制的文件）
+        self.download_count = 0   # 实际从浏览器下载的次数
+        self.cached_count = 0     # 从缓存复制的批次数
+        self.failed_exports = 0   # 本次导出失败的报表批次数
+        self.no_chart_ids = set()  # 按 ID 单独导出后仍没有 Chart data 的视频（如该时段无数据）
         self.exported_videos = set()  # 记录已导出的视频（用文本标识）
         
     async def connect(self) -> bool:
+        """连接浏览器：按 BROWSER_MODE 连接已打开的 Chrome 或自己启动"""
+        if BROWSER_MODE == "launch":
+            return await self.launch()
+        return await self.connect_cdp()
+    
+    async def connect_cdp(self) -> bool:
         """连接到已打开的 Chrome"""
         print("\n📌 连接 Chrome...")
         
         try:
-            self.playwright = await async_playwright().start()
+            if not self.playwright:
+                self.playwright = await async_playwright().start()
+            # 重连前先断开旧连接，避免长时间运行时连接泄漏
+            await self.disconnect()
             self.browser = await self.playwright.chromium.connect_over_cdp(
                 f"http://localhost:{CHROME_DEBUG_PORT}"
             )
@@ -102,6 +446,102 @@ class YouTubeExporter:
             print("   请确保已运行 start_chrome.bat")
             return False
     
+    async def launch(self) -> bool:
+        """用持久化登录配置启动浏览器（默认无头），并打开 START_URL"""
+        print(f"\n📌 启动浏览器{'（无头）' if HEADLESS else ''}...")
+        self.needs_login = False
+        
+        try:
+            if not self.playwright:
+                self.playwright = await async_playwright().start()
+            self.context = await self.playwright.chromium.launch_persistent_context(
+                CHROME_PROFILE_DIR,
+                headless=HEADLESS,
+                channel=BROWSER_CHANNEL,
+                accept_downloads=True,
+            )
+            
+            self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+            await self.page.goto(START_URL, wait_until="domcontentloaded")
+            await asyncio.sleep(3)
+            
+            # 配置里没有登录状态时才导入 --save-login 导出的 Cookie，
+            # 已登录时不导入，避免用旧文件覆盖浏览器轮换后的新 Cookie
+            # （持久化上下文不支持 storage_state 参数，只能补 Cookie）
+            if "accounts.google.com" in self.page.url and os.path.exists(LOGIN_STATE_FILE):
+                with open(LOGIN_STATE_FILE, 'r', encoding='utf-8') as f:
+                    await self.context.add_cookies(json.load(f).get('cookies', []))
+                print(f"   🔑 未登录，已导入登录状态: {os.path.basename(LOGIN_STATE_FILE)}")
+                await self.page.goto(START_URL, wait_until="domcontentloaded")
+                await asyncio.sleep(3)
+            
+            # 仍在登录页，说明配置里没有保存登录状态，登录文件也已失效或不存在
+            if "accounts.google.com" in self.page.url:
+                self.needs_login = True
+                if not HEADLESS:
+                    # 有界面时直接在窗口里登录，登录状态保存在 CHROME_PROFILE_DIR
+                    print("   🔑 请在打开的窗口中登录 YouTube Studio...")
+                    await self.page.wait_for_url("**studio.youtube.com/**", timeout=0)
+                    self.needs_login = False
+                    await self.page.goto(START_URL, wait_until="domcontentloaded")
+                    await asyncio.sleep(3)
+                else:
+                    print("   ❌ 未登录，二选一：")
+                    print("      1. 在已登录的电脑上运行 --save-login，把 youtube_login.json 拷到本机")
+                    print("      2. 设置 HEADLESS = False 运行一次，在窗口里登录")
+                    return False
+            
+            print(f"   ✅ 已启动: {self.page.url[:70]}...")
+            return True
+            
+        except Exception as e:
+            print(f"   ❌ 启动失败: {e}")
+            print(f"   请确保配置目录未被其他 Chrome 占用: {CHROME_PROFILE_DIR}")
+            return False
+    
+    async def is_healthy(self) -> bool:
+        """检查页面是否仍可用"""
+        if not self.page or self.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(self.page.evaluate("1"), timeout=5)
+            return True
+        except Exception:
+            return False
+    
+    async def ensure_connected(self) -> bool:
+        """
+        复用已连接的浏览器（保持预热），不健康时自动重连 / 重启
+        同一进程内连续执行多个任务时，每个任务开始前调用
+        """
+        if await self.is_healthy():
+            return True
+        
+        if self.page:
+            print("   ⚠️ 浏览器已失效，重新连接...")
+        await self.disconnect()
+        
+        for _ in range(RELAUNCH_ATTEMPTS):
+            if await self.connect():
+                return True
+            await self.disconnect()
+            if self.needs_login:
+                # 未登录时重启也不会成功
+                return False
+            await asyncio.sleep(2)
+        return False
+    
+    async def save_login(self, path: str = LOGIN_STATE_FILE) -> bool:
+        """把当前浏览器的登录状态（Cookie 等）导出为 JSON，供其他机器的 launch 模式导入"""
+        context = self.context or (self.browser.contexts[0] if self.browser else None)
+        if not context:
+            print("   ❌ 没有可导出的浏览器")
+            return False
+        await context.storage_state(path=path)
+        print(f"   ✅ 登录状态已保存: {path}")
+        print("   ⚠️ 此文件等同于账号登录凭据，请妥善保管")
+        return True
+    
     async def get_video_checkboxes(self) -> list:
         """获取所有视频的复选框，返回包含索引的信息"""
         checkboxes = await self.page.evaluate(r'''() => {
@@ -242,15 +682,15 @@ class YouTubeExporter:
         await asyncio.sleep(0.5)
     
     async def scroll_down_once(self) -> int:
-        """向下滚动一次，返回当前视频数量"""
-        await self.page.evaluate("""
+        """向下滚动一次，返回滚动后的位置（位置不再变化说明已到底）"""
+        position = await self.page.evaluate("""
             () => {
                 // 1. 优先尝试滚动 YouTube Studio 专用的表格容器
                 // ytcp-table-body 是包含视频列表的主要容器
                 const tableBody = document.querySelector('ytcp-table-body');
                 if (tableBody && tableBody.scrollHeight > tableBody.clientHeight) {
                     tableBody.scrollBy(0, 400); // 适配 5 个视频的高度
-                    return;
+                    return tableBody.scrollTop;
                 }
 
                 // 2. 备用方案：查找其他可滚动元素
@@ -258,19 +698,22 @@ class YouTubeExporter:
                     '[class*="table-body"], [class*="scroll"], ' +
                     '[style*="overflow"], main, [class*="content"]'
                 );
+                let position = 0;
                 for (const el of scrollables) {
                     if (el.scrollHeight > el.clientHeight) {
                         el.scrollBy(0, 400);
+                        position += el.scrollTop;
                     }
                 }
                 
                 // 3. 最后尝试滚动整个窗口
                 window.scrollBy(0, 400);
+                return position + window.scrollY;
             }
         """)
         # 给页面一点时间加载新内容
         await asyncio.sleep(1.5)
-        return 0
+        return position or 0
     
     async def scroll_to_top(self):
         """滚动回顶部"""
@@ -402,23 +845,60 @@ class YouTubeExporter:
         
         return True
     
-    async def export_once(self) -> str:
+    async def switch_report(self, name: str) -> bool:
+        """切换高级模式的报表标签（如 流量来源、地理位置），已在该标签时不再点击"""
+        if name == self.active_report:
+            return True
+        
+        result = await self.page.evaluate(r'''(name) => {
+            const tabs = document.querySelectorAll('[role="tab"], tp-yt-paper-tab');
+            let fallback = null;
+            for (const tab of tabs) {
+                const rect = tab.getBoundingClientRect();
+                if (rect.width === 0 || rect.height === 0) continue;
+                
+                const text = (tab.textContent || '').trim();
+                // 优先完全匹配，其次包含匹配
+                if (text === name) {
+                    tab.click();
+                    return true;
+                }
+                if (!fallback && text.includes(name)) fallback = tab;
+            }
+            if (fallback) {
+                fallback.click();
+                return true;
+            }
+            return false;
+        }''', name)
+        
+        if not result:
+            print(f"   ❌ 未找到报表标签: {name}")
+            return False
+        
+        # 等待报表数据刷新
+        await asyncio.sleep(2)
+        self.active_report = name
+        return True
+    
+    async def export_once(self, download_dir: str = DOWNLOADS_DIR) -> str:
         """执行一次导出，返回文件路径"""
-        os.makedirs(DOWNLOADS_DIR, exist_ok=True)
+        os.makedirs(download_dir, exist_ok=True)
         
         if not await self.click_export_button():
             return None
         
         try:
-            async with self.page.expect_download(timeout=30000) as download_info:
+            async with self.page.expect_download(timeout=EXPORT_TIMEOUT_MS) as download_info:
                 if not await self.click_csv_option():
                     return None
             
             download = await download_info.value
             filename = download.suggested_filename
-            filepath = os.path.join(DOWNLOADS_DIR, f"{self.exported_count:03d}_{filename}")
+            filepath = os.path.join(download_dir, f"{self.exported_count:03d}_{filename}")
             await download.save_as(filepath)
             self.exported_count += 1
+            self.download_count += 1
             return filepath
             
         except Exception as e:
@@ -512,19 +992,275 @@ class YouTubeExporter:
 
         return len(selected_titles), selected_titles
 
-    async def export_all(self) -> list:
+    async def select_videos_by_ids(self, videos: dict, from_top: bool = True) -> list:
         """
-        批量导出所有视频 - 简单直接版
-        
-        策略：每轮直接在当前页面勾选12个，导出，滚动，重复
+        按视频 ID 精确勾选（行内链接 / 缩略图包含 ID），找不到 ID 时按完整标题匹配
+        videos: {视频ID: 标题}，返回成功勾选的视频 ID 列表
+        from_top=False 时从当前位置继续向下找（批次按表格顺序排列时，一次向下滚动服务所有批次），
+        到底仍有没找到的视频时再从顶部找一遍
         """
-        print("\n" + "=" * 55)
-        print("   📊 开始批量导出")
-        print("=" * 55)
+        remaining = dict(videos)
+        selected = []
+        last_position = None
+        stuck = 0
+        restarted = from_top
         
+        if from_top:
+            await self.scroll_to_top()
+        while True:
+            found = await self.page.evaluate(r'''(targets) => {
+                const found = [];
+                const checkboxes = document.querySelectorAll("[role='checkbox']");
+                
+                for (const cb of checkboxes) {
+                    const rect = cb.getBoundingClientRect();
+                    if (rect.width === 0 || rect.height === 0) continue;
+                    if (cb.getAttribute("aria-checked") === "true") continue;
+                    
+                    // 向上找到只包含这一个 checkbox 的行，查找目标 ID
+                    let row = cb;
+                    let matched = null;
+                    for (let k = 0; k < 10 && row.parentElement; k++) {
+                        row = row.parentElement;
+                        if (row.querySelectorAll("[role='checkbox']").length > 1) break;
+                        
+                        const html = row.innerHTML;
+                        const lines = (row.innerText || "").split("\n").map(t => t.trim());
+                        for (const [id, title] of Object.entries(targets)) {
+                            if (found.includes(id)) continue;
+                            if (html.includes(id) || (title && lines.includes(title))) {
+                                matched = id;
+                                break;
+                            }
+                        }
+                        if (matched) break;
+                    }
+                    
+                    if (matched) {
+                        cb.click();
+                        found.push(matched);
+                    }
+                }
+                return found;
+            }''', remaining)
+            
+            for video_id in found:
+                print(f"      ✓ [ID] {video_id} {remaining.pop(video_id, '')[:40]}")
+                selected.append(video_id)
+            
+            if not remaining:
+                break
+            
+            # 连续两次滚动位置不变（等待加载后仍不变）说明已到底
+            position = await self.scroll_down_once()
+            stuck = stuck + 1 if position == last_position else 0
+            if stuck >= 2:
+                if restarted:
+                    break  # 从顶部找过了，剩下的视频不在当前视图
+                # 剩下的视频可能在当前位置上方，回到顶部再找一遍
+                restarted = True
+                await self.scroll_to_top()
+                last_position, stuck = None, 0
+                continue
+            last_position = position
+        
+        for video_id, title in remaining.items():
+            print(f"      ⚠️ 未找到: {video_id} {title[:40]}")
+        
+        if selected:
+            await asyncio.sleep(1.0)
+        return selected
+    
+    async def reconcile(self, reports: list = None) -> list:
+        """
+        对账补导出：找出 Table data 中有、但所有 Chart data 中都没有的视频，
+        按 ID 精确勾选后只导出这些视频。返回新下载的文件列表
+        按 ID 导出后 Chart data 里仍没有的视频记入 no_chart_ids，不再重试，也不算缺失
+        """
+        download_dir = report_download_dir(reports[0] if reports else None, self.shard)
         downloaded_files = []
-        exported_video_titles = set()  # 用标题判重
-        processed_titles = set()       # 记录已处理（勾选过）的视频，防止重复勾选
+        
+        for round_num in range(1, RECONCILE_ROUNDS + 1):
+            missing = find_missing_videos(download_dir, self.no_chart_ids)
+            if not missing:
+                if self.no_chart_ids:
+                    print(f"\n   ✅ 对账完成：{len(self.no_chart_ids)} 个视频没有 Chart data，其余都有")
+                else:
+                    print("\n   ✅ 对账完成：所有视频都有 Chart data")
+                return downloaded_files
+            
+            print(f"\n{'─' * 55}")
+            print(f"🔍 对账第 {round_num} 轮：缺少 {len(missing)} 个视频")
+            print(f"{'─' * 55}")
+            
+            missing_ids = list(missing)
+            for i in range(0, len(missing_ids), MAX_VIDEOS_PER_EXPORT):
+                batch = {vid: missing[vid] for vid in missing_ids[i:i + MAX_VIDEOS_PER_EXPORT]}
+                
+                await self.unselect_all()
+                selected = await self.select_videos_by_ids(batch)
+                if not selected:
+                    continue
+                
+                results = await self.export_batch(reports, selected)
+                for report, filepath, _ in results:
+                    if filepath:
+                        downloaded_files.append(filepath)
+                        print(f"   ✅ 补导出: {os.path.basename(filepath)}")
+                    else:
+                        self.failed_exports += 1
+                        print(f"   ❌ 补导出失败{f' ({report})' if report else ''}")
+                
+                # 勾选了却仍不在 Chart data 里，说明这个视频本身没有图表数据
+                _, filepath, _ = results[0]
+                if filepath:
+                    no_chart = set(selected) - get_chart_video_ids(filepath)
+                    for video_id in no_chart:
+                        print(f"   ℹ️ 没有 Chart data，不再重试: {video_id} {missing[video_id][:40]}")
+                    self.no_chart_ids |= no_chart
+        
+        missing = find_missing_videos(download_dir, self.no_chart_ids)
+        if missing:
+            print(f"\n   ⚠️ 对账后仍缺少 {len(missing)} 个视频:")
+            for video_id, title in missing.items():
+                print(f"      - {video_id} {title[:40]}")
+        return downloaded_files
+    
+    async def select_next_batch(self, processed_titles: set) -> list:
+        """勾选下一批未处理的视频，返回本批视频标题（空列表表示全部完成）"""
+        # 1. 取消所有勾选
+        print("   🔄 取消所有勾选...")
+        await self.unselect_all()
+        await asyncio.sleep(0.3)
+        
+        # 2. 直接用 JS 勾选前 N 个未勾选视频
+        print("   ☑️ 勾选视频...")
+        # 传入 processed_titles 以跳过已处理的视频
+        count, videos = await self.select_first_n_unchecked(MAX_VIDEOS_PER_EXPORT, exclude_titles=processed_titles)
+        
+        if count == 0:
+            # 尝试滚动找更多
+            print("   📜 滚动查找更多...")
+            for _ in range(3):
+                await self.scroll_down_once()
+                count, videos = await self.select_first_n_unchecked(MAX_VIDEOS_PER_EXPORT, exclude_titles=processed_titles)
+                if count > 0:
+                    break
+        
+        print(f"   ✅ 成功勾选 {count} 个视频:")
+        for v in videos:
+            print(f"      - {v[:45]}")
+            processed_titles.add(v)  # 标记为已处理
+        
+        return videos
+    
+    def load_index(self, view_url: str) -> tuple:
+        """
+        返回某个视图上次导出的 ({视频ID: 标题}, 没有 Chart data 的视频ID)，没有视频列表时为 (None, 空集合)
+        先查内存（守护进程中连续任务复用），再查磁盘缓存；与缓存使用同一个有效期
+        """
+        if not self.cache:
+            return None, set()
+        saved = self.video_index.get(view_url)
+        if saved and time.time() - saved[0] < self.cache.ttl:
+            return saved[1], set(saved[2])
+        saved = self.cache.get_index(view_url)
+        if not saved:
+            return None, set()
+        return saved['videos'], set(saved['no_chart'])
+    
+    def save_index(self, view_url: str, videos: dict):
+        """保存最新 Table data 中的视频列表和已确认没有 Chart data 的视频（内存 + 磁盘缓存）"""
+        if self.cache:
+            self.video_index[view_url] = (time.time(), videos, set(self.no_chart_ids))
+            self.cache.put_index(view_url, videos, self.no_chart_ids)
+    
+    def batch_key(self, report: str, video_ids: list) -> str:
+        """批次缓存键：视图链接 + 报表 + 本批视频 ID"""
+        return ExportCache.make_key('batch', self.view_url, report, sorted(video_ids))
+    
+    def copy_cached_batch(self, report: str, cached: str) -> str:
+        """把缓存的批次 ZIP 复制到下载目录（按导出顺序编号），返回文件路径"""
+        if not cached:
+            return None
+        download_dir = report_download_dir(report, self.shard)
+        os.makedirs(download_dir, exist_ok=True)
+        filepath = os.path.join(download_dir, f"{self.exported_count:03d}_cached.zip")
+        shutil.copyfile(cached, filepath)
+        self.exported_count += 1
+        self.cached_count += 1
+        print(f"   💾 使用缓存{f' {report}' if report else ''}")
+        return filepath
+    
+    async def export_batch(self, reports: list = None, videos: list = None) -> list:
+        """
+        导出当前已勾选的这一批视频
+        多报表模式下依次切换每个报表标签导出，最后切回第一个标签（已在该标签时不切换）
+        启用缓存且传入 videos（本批视频 ID）时，未过期的报表 ZIP 直接从缓存复制；
+        新导出的 ZIP 只有在第一个报表的 Chart data 包含本批全部视频
+        （已确认没有 Chart data 的除外）时才写入缓存
+        返回 [(报表名, 文件路径, 是否来自缓存), ...]，失败的报表文件路径为 None
+        """
+        results = []
+        switched = False
+        cacheable = True
+        
+        for i, report in enumerate(reports or [None]):
+            download_dir = report_download_dir(report, self.shard)
+            
+            key = self.batch_key(report, videos) if self.cache and videos else None
+            if key:
+                cached = self.cache.get_batch(key)
+                if cached:
+                    results.append((report, self.copy_cached_batch(report, cached), True))
+                    continue
+            
+            print(f"   📤 导出{f'报表: {report}' if report else '...'}")
+            filepath = None
+            if not report:
+                filepath = await self.export_once(download_dir)
+            elif await self.switch_report(report):
+                switched = True
+                filepath = await self.export_once(download_dir)
+            
+            # 第一个报表缺视频时，这一批的所有报表都不缓存
+            if i == 0 and filepath and key:
+                cacheable = set(videos) - self.no_chart_ids <= get_chart_video_ids(filepath)
+            if filepath and key and cacheable:
+                self.cache.put_batch(key, filepath)
+            results.append((report, filepath, False))
+        
+        # 切回第一个报表，保证下一轮能看到视频列表
+        if switched and len(reports) > 1:
+            await self.switch_report(reports[0])
+        
+        return results
+    
+    def record_results(self, results: list, downloaded_files: list, exported_video_titles: set):
+        """记录一批的导出结果：统计失败，汇总第一个报表 ZIP 中的视频"""
+        for i, (report, filepath, _) in enumerate(results):
+            if not filepath:
+                self.failed_exports += 1
+                print(f"   ❌ 导出失败{f' ({report})' if report else ''}")
+                continue
+            
+            downloaded_files.append(filepath)
+            print(f"   ✅ 下载: {os.path.basename(filepath)}")
+            
+            # 只用第一个报表检查 ZIP 里的视频
+            if i > 0:
+                continue
+            actual_videos = get_videos_from_zip(filepath)
+            print(f"   📋 ZIP 包含 {len(actual_videos)} 个视频:")
+            for v in actual_videos:
+                print(f"      - {v[:45]}")
+                exported_video_titles.add(v)
+            
+            print(f"   📊 累计导出 {len(exported_video_titles)} 个不同视频")
+    
+    async def export_by_position(self, reports: list, downloaded_files: list, exported_video_titles: set):
+        """按表格顺序导出：每轮直接在当前页面勾选一批，导出，滚动，重复"""
+        processed_titles = set()  # 记录已处理（勾选过）的视频，防止重复勾选
         round_num = 0
         
         while round_num < MAX_EXPORT_ROUNDS:
@@ -533,77 +1269,290 @@ class YouTubeExporter:
             print(f"📥 第 {round_num} 轮")
             print(f"{'─' * 55}")
             
-            # 1. 取消所有勾选
-            print("   🔄 取消所有勾选...")
-            await self.unselect_all()
-            await asyncio.sleep(0.3)
+            # 1-2. 取消勾选并勾选下一批
+            videos = await self.select_next_batch(processed_titles)
+            if not videos:
+                print("   ✅ 所有视频都已导出完成！")
+                break
             
-            # 2. 直接用 JS 勾选前12个未勾选视频
-            print("   ☑️ 勾选视频...")
-            # 传入 processed_titles 以跳过已处理的视频
-            count, videos = await self.select_first_n_unchecked(MAX_VIDEOS_PER_EXPORT, exclude_titles=processed_titles)
+            # 3. 导出（多报表模式下每个报表一次）
+            self.record_results(await self.export_batch(reports), downloaded_files, exported_video_titles)
             
-            print(f"   ✅ 成功勾选 {count} 个视频:")
-            for v in videos:
-                print(f"      - {v[:45]}")
-                processed_titles.add(v)  # 标记为已处理
-            
-            if count == 0:
-                # 尝试滚动找更多
-                print("   📜 滚动查找更多...")
-                for _ in range(3):
-                    await self.scroll_down_once()
-                    count, videos = await self.select_first_n_unchecked(MAX_VIDEOS_PER_EXPORT, exclude_titles=processed_titles)
-                    if count > 0:
-                        for v in videos:
-                            processed_titles.add(v)
-                        break
-                
-                if count == 0:
-                    print("   ✅ 所有视频都已导出完成！")
-                    break
+            # 4. 滚动，准备下一轮
+            await self.scroll_down_once()
+            await asyncio.sleep(0.5)
+    
+    async def probe_index(self, reports: list, downloaded_files: list, exported_video_titles: set) -> tuple:
+        """
+        第一次导出某个视图时还没有视频列表：按表格顺序正常导出第一批，
+        从其中的 Table data 读取完整视频列表，这一批按实际包含的视频 ID 写入批次缓存
+        返回 ({视频ID: 标题}, 第一批已导出的视频 ID)，失败时返回 ({}, 空集合)
+        """
+        print("\n   🔎 还没有视频列表，先按表格顺序导出第一批获取...")
+        if not await self.select_next_batch(set()):
+            return {}, set()
+        results = await self.export_batch(reports)
+        _, filepath, _ = results[0]
+        videos = get_table_videos(filepath) if filepath else {}
+        if not videos:
+            # 拿不到视频列表时丢弃这一批，改为按表格顺序从头导出
+            for _, path, _ in results:
+                if path:
+                    os.remove(path)
+            return {}, set()
+        
+        self.record_results(results, downloaded_files, exported_video_titles)
+        self.save_index(self.view_url, videos)
+        print(f"   ✅ 视频列表: {len(videos)} 个视频")
+        
+        # 第一批就是表格最前面的视频，与之后按表格顺序分组的第一批相同，重跑时可以直接命中
+        exported = get_chart_video_ids(filepath)
+        if exported and all(path for _, path, _ in results):
+            for report, path, _ in results:
+                self.cache.put_batch(self.batch_key(report, exported), path)
+        return videos, exported
+    
+    async def export_by_id(self, reports: list, downloaded_files: list, exported_video_titles: set):
+        """
+        按视频列表固定分组导出：Table data 中的视频按顺序每 MAX_VIDEOS_PER_EXPORT 个一批，按 ID 勾选
+        批次按表格顺序排列，勾选时从上一批的位置继续向下滚动，整个表格只需滚动一遍；
+        所有报表都有未过期缓存的批次不操作浏览器
+        新增或删除视频只影响表格中排在它之后的批次
+        """
+        index, _ = self.load_index(self.view_url)
+        exported = set()
+        if not index:
+            index, exported = await self.probe_index(reports, downloaded_files, exported_video_titles)
+        if not index:
+            print("   ⚠️ 无法获取视频列表，改为按表格顺序导出")
+            await self.export_by_position(reports, downloaded_files, exported_video_titles)
+            return
+        
+        planned = set(index)
+        ids = [vid for vid in index if vid not in exported]
+        chunks = [ids[i:i + MAX_VIDEOS_PER_EXPORT] for i in range(0, len(ids), MAX_VIDEOS_PER_EXPORT)]
+        round_num = 1 if exported else 0
+        from_top = True
+        
+        while chunks and round_num < MAX_EXPORT_ROUNDS:
+            chunk = chunks.pop(0)
+            round_num += 1
+            print(f"\n{'─' * 55}")
+            print(f"📥 第 {round_num} 轮")
+            print(f"{'─' * 55}")
+            
+            # 先查缓存：所有报表都命中时直接复制，不勾选、不滚动
+            keys = {report: self.batch_key(report, chunk) for report in (reports or [None])}
+            if all(self.cache.has_batch(key) for key in keys.values()):
+                results = [
+                    (report, self.copy_cached_batch(report, self.cache.get_batch(key)), True)
+                    for report, key in keys.items()
+                ]
+                self.record_results(results, downloaded_files, exported_video_titles)
+                continue
             
-            # 3. 导出
-            print("   📤 导出...")
-            filepath = await self.export_once()
+            print("   🔄 取消所有勾选...")
+            await self.unselect_all()
+            print("   ☑️ 按 ID 勾选视频...")
+            selected = await self.select_videos_by_ids({vid: index[vid] for vid in chunk}, from_top)
+            from_top = False
+            if not selected:
+                continue
+            
+            results = await self.export_batch(reports, selected)
+            self.record_results(results, downloaded_files, exported_video_titles)
             
-            if filepath:
+            # 用新导出的 Table data 刷新视频列表，发现新视频时追加批次
+            _, filepath, from_cache = results[0]
+            if filepath and not from_cache:
+                fresh = get_table_videos(filepath)
+                if fresh:
+                    self.save_index(self.view_url, fresh)
+                    new_ids = [vid for vid in fresh if vid not in planned]
+                    if new_ids:
+                        print(f"   🆕 发现 {len(new_ids)} 个新视频，追加批次")
+                        index.update(fresh)
+                        planned.update(new_ids)
+                        chunks.extend(
+                            new_ids[i:i + MAX_VIDEOS_PER_EXPORT]
+                            for i in range(0, len(new_ids), MAX_VIDEOS_PER_EXPORT)
+                        )
+    
+    async def export_all(self, reports: list = None, view_url: str = None) -> tuple:
+        """
+        批量导出所有视频，返回 (文件列表, 是否完整)
+        
+        不使用缓存时：每轮直接在当前页面按表格顺序勾选一批，导出，滚动，重复
+        使用缓存时：按视频 ID 固定分组，只有过期或缺失的批次才操作浏览器
+        传入 reports 时每批勾选一次，依次导出每个报表（勾选开销由所有报表分摊）
+        完整 = 没有导出失败的批次，且对账后没有缺失的视频（确认没有 Chart data 的视频不算缺失）
+        """
+        print("\n" + "=" * 55)
+        print("   📊 开始批量导出")
+        if reports:
+            print(f"   📑 报表: {', '.join(reports)}")
+        print("=" * 55)
+        
+        if reports:
+            await self.switch_report(reports[0])
+        self.view_url = view_url or self.page.url
+        self.failed_exports = 0
+        # 之前确认过没有 Chart data 的视频，不再阻止批次缓存和完整判断
+        _, self.no_chart_ids = self.load_index(self.view_url)
+        
+        downloaded_files = []
+        exported_video_titles = set()  # 用标题判重
+        
+        if self.cache:
+            await self.export_by_id(reports, downloaded_files, exported_video_titles)
+        else:
+            await self.export_by_position(reports, downloaded_files, exported_video_titles)
+        
+        # 5. 对账：只补导出缺失的视频
+        primary_dir = report_download_dir(reports[0] if reports else None, self.shard)
+        if RECONCILE_ROUNDS > 0:
+            no_chart_before = set(self.no_chart_ids)
+            reconciled_titles = set()
+            for filepath in await self.reconcile(reports):
                 downloaded_files.append(filepath)
-                print(f"   ✅ 下载: {os.path.basename(filepath)}")
-                
-                # 检查 ZIP 里的视频
-                actual_videos = get_videos_from_zip(filepath)
-                print(f"   📋 ZIP 包含 {len(actual_videos)} 个视频:")
-                for v in actual_videos:
-                    print(f"      - {v[:45]}")
-                    exported_video_titles.add(v)
-                
-                print(f"   📊 累计导出 {len(exported_video_titles)} 个不同视频")
-            else:
-                print("   ❌ 导出失败")
+                if os.path.dirname(filepath) == primary_dir:
+                    reconciled_titles.update(get_videos_from_zip(filepath))
+            if reconciled_titles:
+                print(f"   📊 对账补回 {len(reconciled_titles - exported_video_titles)} 个视频")
+            exported_video_titles.update(reconciled_titles)
             
-            # 4. 滚动，准备下一轮
-            await self.scroll_down_once()
-            await asyncio.sleep(0.5)
+            # 记住新确认没有 Chart data 的视频，之后的导出不再补导出它们
+            index, _ = self.load_index(self.view_url)
+            if index and self.no_chart_ids != no_chart_before:
+                self.save_index(self.view_url, index)
+        
+        missing = find_missing_videos(primary_dir, self.no_chart_ids)
+        complete = self.failed_exports == 0 and not missing
         
         print(f"\n{'=' * 55}")
         print(f"   📊 完成！共 {len(downloaded_files)} 个文件")
         print(f"   📊 累计 {len(exported_video_titles)} 个不同视频")
+        if not complete:
+            print(f"   ⚠️ 结果不完整：{self.failed_exports} 次导出失败，缺少 {len(missing)} 个视频")
         print(f"{'=' * 55}")
         
-        return downloaded_files
+        return downloaded_files, complete
+    
+    async def export_window(self, start: date, end: date, reports: list = None) -> tuple:
+        """打开某个时间窗口的链接并导出全部视频，返回 (文件列表, 是否完整)"""
+        self.shard = shard_name(start, end)
+        url = shard_url(start, end)
+        print(f"\n🗓️ 时间窗口 {start} ~ {end}")
+        await self.page.goto(url, wait_until="domcontentloaded")
+        self.active_report = None
+        await asyncio.sleep(3)
+        # 用模板生成的链接作为视图标识，与 merged_cache_key 一致
+        return await self.export_all(reports, view_url=url)
+    
+    async def export_sharded(self, reports: list = None) -> tuple:
+        """
+        按 SHARD_DAYS 拆分时间范围，逐个窗口导出，返回 (文件列表, 是否全部完整)
+        SHARD_CONCURRENCY > 1 时每个窗口开一个新标签页并发导出
+        """
+        windows = split_date_range(SHARD_START, SHARD_END, SHARD_DAYS)
+        print(f"\n🗓️ 时间分片: {len(windows)} 个窗口，每个 {SHARD_DAYS} 天")
+        
+        if SHARD_CONCURRENCY <= 1:
+            downloaded_files = []
+            complete = True
+            for start, end in windows:
+                files, window_complete = await self.export_window(start, end, reports)
+                downloaded_files.extend(files)
+                complete = complete and window_complete
+            return downloaded_files, complete
+        
+        context = self.context or self.browser.contexts[0]
+        semaphore = asyncio.Semaphore(SHARD_CONCURRENCY)
+        
+        async def run_window(start, end):
+            async with semaphore:
+                # 每个窗口一个独立的导出器和标签页，共用同一个浏览器
+                worker = YouTubeExporter()
+                worker.cache = self.cache
+                worker.page = await context.new_page()
+                try:
+                    return await worker.export_window(start, end, reports)
+                finally:
+                    await worker.page.close()
+                    # 汇总到主导出器，供任务指标统计
+                    self.download_count += worker.download_count
+                    self.cached_count += worker.cached_count
+        
+        results = await asyncio.gather(*(run_window(start, end) for start, end in windows))
+        downloaded_files = [filepath for files, _ in results for filepath in files]
+        return downloaded_files, all(complete for _, complete in results)
+    
+    async def merged_cache_key(self, reports: list = None) -> str:
+        """
+        合并结果的缓存键：视图链接 + 报表 + 各视图上次导出的视频列表（来自 Table data）
+        不滚动页面；还没有视频列表时返回 None
+        """
+        if SHARD_URL_TEMPLATE:
+            urls = [shard_url(start, end) for start, end in split_date_range(SHARD_START, SHARD_END, SHARD_DAYS)]
+        else:
+            if reports:
+                await self.switch_report(reports[0])
+            urls = [self.page.url]
+        
+        indexes = []
+        for url in urls:
+            videos, _ = self.load_index(url)
+            if not videos:
+                return None
+            indexes.append(sorted(videos))
+        return ExportCache.make_key('merged', urls, reports or [], indexes)
+    
+    async def export(self, reports: list = None) -> tuple:
+        """
+        按配置导出，返回 (文件列表, 是否完整)
+        设置了 SHARD_URL_TEMPLATE 时按时间分片，否则导出当前视图
+        """
+        self.shard = None
+        if SHARD_URL_TEMPLATE:
+            return await self.export_sharded(reports)
+        return await self.export_all(reports)
+    
+    async def disconnect(self):
+        """断开浏览器但保留 Playwright；launch 模式下关闭自己启动的浏览器"""
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception:
+                pass
+        elif self.browser:
+            # cdp 模式：只断开连接，不会关闭用户手动启动的 Chrome
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        self.context = None
+        self.browser = None
+        self.page = None
+        self.active_report = None
     
     async def close(self):
+        await self.disconnect()
         if self.playwright:
             await self.playwright.stop()
+            self.playwright = None
 
 
-def merge_exports(download_dir: str = DOWNLOADS_DIR) -> dict:
+def merge_exports(download_dir: str = DOWNLOADS_DIR, output_subdir: str = None) -> dict:
     """
     合并导出文件
     - Table data: 用第一个（已包含所有视频汇总）
     - Totals: 用第一个  
     - Chart data: 拼接所有（每批视频的详细时间序列数据）
+    output_subdir 为空时输出到 OUTPUT_DIR/merged_时间戳
+    
+    时间分片（download_dir 下有 shard_* 子目录）：
+    - 每个时间窗口各自的 Table data / Totals 单独保存
+    - Chart data 按窗口起始日期顺序拼接成完整时间序列
     """
     print("\n📌 合并导出文件...")
     
@@ -611,101 +1560,111 @@ def merge_exports(download_dir: str = DOWNLOADS_DIR) -> dict:
         print("   没有下载文件")
         return None
     
-    table_data = None
-    totals_data = None
+    # 时间分片按目录名（起始日期）排序；没有分片时整个目录是一组
+    shard_dirs = sorted(
+        d for d in os.listdir(download_dir)
+        if d.startswith('shard_') and os.path.isdir(os.path.join(download_dir, d))
+    )
+    groups = [(d, os.path.join(download_dir, d)) for d in shard_dirs] or [(None, download_dir)]
+    
+    table_data = {}   # 窗口 -> Table data
+    totals_data = {}  # 窗口 -> Totals
     chart_data_rows = []
     chart_fieldnames = None
-    all_videos_in_charts = {}  # 记录每个文件包含的视频
+    zip_count = 0
     
-    zip_files = sorted([f for f in os.listdir(download_dir) if f.endswith('.zip')])
-    
-    if not zip_files:
-        print("   没有找到 ZIP 文件")
-        return None
-    
-    print(f"   找到 {len(zip_files)} 个 ZIP 文件")
-    
-    for i, filename in enumerate(zip_files):
-        filepath = os.path.join(download_dir, filename)
-        is_first = (i == 0)
-        videos_in_this_file = set()
+    for shard, group_dir in groups:
+        zip_files = sorted([f for f in os.listdir(group_dir) if f.endswith('.zip')])
+        if shard:
+            print(f"\n   🗓️ 时间窗口 {shard_label(shard)}: {len(zip_files)} 个 ZIP 文件")
+        else:
+            print(f"   找到 {len(zip_files)} 个 ZIP 文件")
+        zip_count += len(zip_files)
+        all_videos_in_charts = {}  # 记录每个文件包含的视频
         
-        try:
-            with zipfile.ZipFile(filepath, 'r') as zf:
-                for name in zf.namelist():
-                    with zf.open(name) as f:
-                        content = f.read().decode('utf-8-sig')
-                        lines = content.strip().split('\n')
-                        
-                        # Table data - 只用第一个
-                        if ('表格' in name or 'Table' in name) and is_first:
-                            table_data = content
-                            print(f"   ✅ Table data（来自第1个ZIP）")
-                        
-                        # Totals - 只用第一个
-                        elif ('总计' in name or 'Totals' in name) and is_first:
-                            totals_data = content
-                            print(f"   ✅ Totals（来自第1个ZIP）")
-                        
-                        # Chart data - 拼接所有
-                        elif '图表' in name or 'Chart' in name:
-                            reader = csv.DictReader(lines)
-                            if not chart_fieldnames:
-                                chart_fieldnames = reader.fieldnames
-                            
-                            row_count = 0
-                            for row in reader:
-                                chart_data_rows.append(dict(row))
-                                row_count += 1
-                                # 记录视频名
-                                for col in ['视频标题', 'Video title', '视频', 'Video', 'Content']:
-                                    if col in row and row[col]:
-                                        videos_in_this_file.add(row[col])
-                                        break
+        for i, filename in enumerate(zip_files):
+            filepath = os.path.join(group_dir, filename)
+            is_first = (i == 0)
+            videos_in_this_file = set()
+            
+            try:
+                with zipfile.ZipFile(filepath, 'r') as zf:
+                    for name in zf.namelist():
+                        with zf.open(name) as f:
+                            content = f.read().decode('utf-8-sig')
+                            lines = content.strip().split('\n')
                             
-                            print(f"\n   📊 ZIP #{i+1}: {filename}")
-                            print(f"      Chart data: {row_count} 行")
-                            print(f"      包含视频 ({len(videos_in_this_file)} 个):")
-                            for v in list(videos_in_this_file)[:8]:
-                                print(f"        - {v[:50]}")
-                            if len(videos_in_this_file) > 8:
-                                print(f"        ... 还有 {len(videos_in_this_file) - 8} 个")
+                            # Table data - 只用第一个
+                            if ('表格' in name or 'Table' in name) and is_first:
+                                table_data[shard] = content
+                                print(f"   ✅ Table data（来自第1个ZIP）")
                             
-                            all_videos_in_charts[filename] = videos_in_this_file
+                            # Totals - 只用第一个
+                            elif ('总计' in name or 'Totals' in name) and is_first:
+                                totals_data[shard] = content
+                                print(f"   ✅ Totals（来自第1个ZIP）")
                             
-        except Exception as e:
-            print(f"   ⚠️ 处理 {filename} 出错: {e}")
-    
-    # 检查重复
-    print(f"\n   📋 重复检查:")
-    all_unique_videos = set()
-    for fname, videos in all_videos_in_charts.items():
-        overlap = all_unique_videos & videos
-        if overlap:
-            print(f"      ⚠️ {fname} 有 {len(overlap)} 个重复视频")
-        all_unique_videos.update(videos)
-    print(f"      总计去重后: {len(all_unique_videos)} 个不同视频")
+                            # Chart data - 拼接所有
+                            elif '图表' in name or 'Chart' in name:
+                                reader = csv.DictReader(lines)
+                                if not chart_fieldnames:
+                                    chart_fieldnames = reader.fieldnames
+                                
+                                row_count = 0
+                                for row in reader:
+                                    chart_data_rows.append(dict(row))
+                                    row_count += 1
+                                    # 记录视频名
+                                    for col in ['视频标题', 'Video title', '视频', 'Video', 'Content']:
+                                        if col in row and row[col]:
+                                            videos_in_this_file.add(row[col])
+                                            break
+                                
+                                print(f"\n   📊 ZIP #{i+1}: {filename}")
+                                print(f"      Chart data: {row_count} 行")
+                                print(f"      包含视频 ({len(videos_in_this_file)} 个):")
+                                for v in list(videos_in_this_file)[:8]:
+                                    print(f"        - {v[:50]}")
+                                if len(videos_in_this_file) > 8:
+                                    print(f"        ... 还有 {len(videos_in_this_file) - 8} 个")
+                                
+                                all_videos_in_charts[filename] = videos_in_this_file
+                                
+            except Exception as e:
+                print(f"   ⚠️ 处理 {filename} 出错: {e}")
+        
+        # 检查重复（同一时间窗口内）
+        print(f"\n   📋 重复检查:")
+        all_unique_videos = set()
+        for fname, videos in all_videos_in_charts.items():
+            overlap = all_unique_videos & videos
+            if overlap:
+                print(f"      ⚠️ {fname} 有 {len(overlap)} 个重复视频")
+            all_unique_videos.update(videos)
+        print(f"      总计去重后: {len(all_unique_videos)} 个不同视频")
+    
+    if not zip_count:
+        print("   没有找到 ZIP 文件")
+        return None
     
     # 保存结果
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_subdir = os.path.join(OUTPUT_DIR, f"merged_{timestamp}")
+    if not output_subdir:
+        output_subdir = new_merged_dir()
     os.makedirs(output_subdir, exist_ok=True)
     
     result = {}
     
-    # 保存 Table data
-    if table_data:
-        path = os.path.join(output_subdir, "Table data.csv")
-        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
-            f.write(table_data)
-        result['table'] = path
-    
-    # 保存 Totals
-    if totals_data:
-        path = os.path.join(output_subdir, "Totals.csv")
-        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
-            f.write(totals_data)
-        result['totals'] = path
+    # 保存 Table data / Totals（分片时每个窗口一份）
+    for key, name, data in [('table', 'Table data', table_data), ('totals', 'Totals', totals_data)]:
+        for shard, content in data.items():
+            suffix = f" ({shard_label(shard)})" if shard else ""
+            path = os.path.join(output_subdir, f"{name}{suffix}.csv")
+            with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+                f.write(content)
+            if shard:
+                result.setdefault('shards', {}).setdefault(shard, {})[key] = path
+            else:
+                result[key] = path
     
     # 保存合并后的 Chart data
     if chart_data_rows and chart_fieldnames:
@@ -723,16 +1682,280 @@ def merge_exports(download_dir: str = DOWNLOADS_DIR) -> dict:
     return result
 
 
+def merge_all(reports: list = None) -> str:
+    """
+    合并所有报表到同一个 merged_时间戳 目录（每个报表一个子目录）
+    返回该目录，没有可合并的文件时返回 None
+    """
+    merged_dir = new_merged_dir()
+    
+    if not reports:
+        merged_any = bool(merge_exports(output_subdir=merged_dir))
+    else:
+        merged_any = False
+        for report in reports:
+            print(f"\n📑 报表: {report}")
+            result = merge_exports(
+                report_download_dir(report),
+                output_subdir=os.path.join(merged_dir, safe_name(report)),
+            )
+            merged_any = merged_any or bool(result)
+    
+    if not merged_any:
+        shutil.rmtree(merged_dir, ignore_errors=True)
+        return None
+    return merged_dir
+
+
+async def run_export(exporter: YouTubeExporter, reports: list = None) -> dict:
+    """
+    完整导出一次：导出 → 合并
+    返回 {'merged_dir': 合并结果目录（没有结果时为 None）, 'complete': 是否完整,
+          'served_from_cache': 是否直接使用缓存的合并结果}
+    启用缓存时，视图和视频列表都相同且未过期的完整结果直接从缓存复制，不操作浏览器导出
+    """
+    cache = ExportCache() if CACHE_ENABLED else None
+    exporter.cache = cache
+    # 两次任务之间页面可能被手动切换过，第一次切换报表时重新点击
+    exporter.active_report = None
+    
+    if cache:
+        key = await exporter.merged_cache_key(reports)
+        cached = cache.get_merged(key) if key else None
+        if cached:
+            merged_dir = new_merged_dir()
+            shutil.copytree(cached, merged_dir, dirs_exist_ok=True)
+            print(f"\n💾 使用缓存的合并结果: {merged_dir}")
+            return {'merged_dir': merged_dir, 'complete': True, 'served_from_cache': True}
+    
+    # 清空旧的下载
+    clear_downloads()
+    
+    # 批量导出
+    _, complete = await exporter.export(reports)
+    
+    # 合并文件
+    merged_dir = merge_all(reports)
+    
+    if cache:
+        print(f"\n💾 缓存: 命中 {cache.hits} 次, 未命中 {cache.misses} 次")
+        # 只缓存完整的结果，否则重跑时会一直拿到缺数据的结果；
+        # 导出后视频列表已更新，重新计算键
+        key = await exporter.merged_cache_key(reports)
+        if merged_dir and complete and key:
+            cache.put_merged(key, merged_dir)
+        elif merged_dir:
+            print("   ⚠️ 结果不完整，不写入合并结果缓存")
+        cache.evict()
+    
+    return {'merged_dir': merged_dir, 'complete': complete, 'served_from_cache': False}
+
+
+class ExportDaemon:
+    """
+    守护进程：保持一个已连接的 YouTubeExporter，按顺序执行本地 HTTP 接口提交的任务
+    
+    接口（JSON）：
+    - POST /jobs         提交任务 {"type": "export" | "merge", "reports": [...], "url": "..."}
+    - GET  /jobs         排队、运行中和最近结束的任务
+    - GET  /jobs/<id>    任务状态和指标
+    - GET  /health       连接状态和队列长度
+    """
+    
+    def __init__(self, host: str = DAEMON_HOST, port: int = DAEMON_PORT):
+        self.host = host
+        self.port = port
+        self.exporter = YouTubeExporter()
+        self.jobs = {}
+        self.queue = None
+        self.loop = None
+    
+    def submit(self, params: dict) -> dict:
+        """登记任务并放入队列（可从 HTTP 线程调用），参数不合法时抛出 ValueError"""
+        if not isinstance(params, dict):
+            raise ValueError("请求体必须是 JSON 对象")
+        
+        job_type = params.get('type', 'export')
+        if job_type not in ('export', 'merge'):
+            raise ValueError(f"未知任务类型: {job_type}")
+        
+        reports = params.get('reports')
+        if reports is not None and not (
+            isinstance(reports, list) and all(isinstance(r, str) and r.strip() for r in reports)
+        ):
+            raise ValueError("reports 必须是非空字符串列表，如 [\"视频\", \"流量来源\"]")
+        
+        url = params.get('url')
+        if url is not None and not (isinstance(url, str) and url.strip()):
+            raise ValueError("url 必须是字符串")
+        if url is not None and SHARD_URL_TEMPLATE:
+            # 分片模式下每个窗口的链接由 SHARD_URL_TEMPLATE 生成，传入的 url 不会生效
+            raise ValueError("已设置 SHARD_URL_TEMPLATE（时间分片），不支持 url 参数")
+        
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'type': job_type,
+            'reports': reports or REPORT_TABS,
+            'url': url,
+            'status': 'queued',
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'metrics': {},
+        }
+        self.jobs[job['id']] = job
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, job['id'])
+        return job
+    
+    async def run_job(self, job: dict):
+        """执行一个任务，记录状态和指标"""
+        job['status'] = 'running'
+        job['started_at'] = datetime.now().isoformat(timespec='seconds')
+        started = time.time()
+        job['metrics']['queued_seconds'] = round(
+            started - datetime.fromisoformat(job['created_at']).timestamp(), 1
+        )
+        downloads_before = self.exporter.download_count
+        cached_before = self.exporter.cached_count
+        
+        print(f"\n{'=' * 55}")
+        print(f"   🧾 任务 {job['id']} ({job['type']})")
+        print(f"{'=' * 55}")
+        
+        try:
+            if job['type'] == 'merge':
+                job['result'] = merge_all(job['reports'])
+            else:
+                if not await self.exporter.ensure_connected():
+                    raise RuntimeError("无法连接浏览器")
+                if job['url']:
+                    await self.exporter.page.goto(job['url'], wait_until="domcontentloaded")
+                    await asyncio.sleep(3)
+                result = await run_export(self.exporter, job['reports'])
+                job['result'] = result['merged_dir']
+                
+                cache = self.exporter.cache
+                job['metrics'].update({
+                    'exports': self.exporter.download_count - downloads_before,
+                    'cached_batches': self.exporter.cached_count - cached_before,
+                    'served_from_cache': result['served_from_cache'],
+                    'complete': result['complete'],
+                    'cache_hits': cache.hits if cache else 0,
+                    'cache_misses': cache.misses if cache else 0,
+                })
+            job['status'] = 'done'
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            print(f"   ❌ 任务失败: {e}")
+        
+        job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        job['metrics']['run_seconds'] = round(time.time() - started, 1)
+        self.prune_jobs()
+    
+    def prune_jobs(self):
+        """只保留最近 DAEMON_MAX_FINISHED_JOBS 个已结束的任务（排队和运行中的不删）"""
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(len(finished) - DAEMON_MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job_id]
+    
+    def make_handler(self):
+        daemon = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def send_json(self, status: int, data):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_GET(self):
+                if self.path == '/health':
+                    self.send_json(200, {
+                        'status': 'ok',
+                        'connected': daemon.exporter.page is not None,
+                        'queued': daemon.queue.qsize(),
+                    })
+                elif self.path == '/jobs':
+                    self.send_json(200, list(daemon.jobs.values()))
+                elif self.path.startswith('/jobs/'):
+                    job = daemon.jobs.get(self.path[len('/jobs/'):])
+                    if job:
+                        self.send_json(200, job)
+                    else:
+                        self.send_json(404, {'error': '任务不存在'})
+                else:
+                    self.send_json(404, {'error': '未知接口'})
+            
+            def do_POST(self):
+                if self.path != '/jobs':
+                    self.send_json(404, {'error': '未知接口'})
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                    params = json.loads(self.rfile.read(length) or b'{}')
+                    self.send_json(202, daemon.submit(params))
+                except ValueError as e:
+                    self.send_json(400, {'error': str(e)})
+            
+            def log_message(self, format, *args):
+                pass  # 不打印每个请求
+        
+        return Handler
+    
+    async def serve(self):
+        """启动 HTTP 接口，并在当前事件循环中逐个执行任务"""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        
+        # 启动时先连接浏览器，之后每个任务开始前检查连接
+        await self.exporter.ensure_connected()
+        
+        server = ThreadingHTTPServer((self.host, self.port), self.make_handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"\n🛰️ 守护进程已启动: http://{self.host}:{self.port}")
+        print("   POST /jobs 提交任务，GET /jobs/<id> 查看状态")
+        
+        try:
+            while True:
+                job_id = await self.queue.get()
+                await self.run_job(self.jobs[job_id])
+        finally:
+            server.shutdown()
+            await self.exporter.close()
+
+
 async def main():
     print("\n" + "=" * 55)
     print("   📊 YouTube Studio 批量导出工具")
     print("   解决每次最多勾选 12 个视频的限制")
     print("=" * 55)
     
+    if "--daemon" in sys.argv[1:]:
+        await ExportDaemon().serve()
+        return
+    
+    if "--save-login" in sys.argv[1:]:
+        # 从 start_chrome.bat 启动并已登录的 Chrome 导出登录状态
+        exporter = YouTubeExporter()
+        try:
+            if await exporter.connect_cdp():
+                await exporter.save_login()
+        finally:
+            await exporter.close()
+        return
+    
     exporter = YouTubeExporter()
     
     try:
-        if not await exporter.connect():
+        if not await exporter.ensure_connected():
+            if BROWSER_MODE == "launch":
+                print("\n❌ 无法启动浏览器")
+                return
             print("\n❌ 无法连接 Chrome")
             print("   1. 运行 start_chrome.bat 启动 Chrome")
             print("   2. 打开 YouTube Studio")
@@ -741,27 +1964,17 @@ async def main():
             print("   5. 重新运行此脚本")
             return
         
-        print("\n" + "-" * 55)
-        print("📋 请确认：")
-        print("   1. 已在 YouTube Studio 高级模式")
-        print("   2. 已设置好时间范围和筛选条件")
-        print("   3. 可以看到视频列表和前面的复选框")
-        print("-" * 55)
-        input("\n准备好后按 Enter 开始...")
-        
-        # 清空旧的下载
-        if os.path.exists(DOWNLOADS_DIR):
-            for f in os.listdir(DOWNLOADS_DIR):
-                try:
-                    os.remove(os.path.join(DOWNLOADS_DIR, f))
-                except:
-                    pass
-        
-        # 批量导出
-        await exporter.export_all()
+        # 无头模式无人值守，页面由 START_URL 决定，不需要确认
+        if not (BROWSER_MODE == "launch" and HEADLESS):
+            print("\n" + "-" * 55)
+            print("📋 请确认：")
+            print("   1. 已在 YouTube Studio 高级模式")
+            print("   2. 已设置好时间范围和筛选条件")
+            print("   3. 可以看到视频列表和前面的复选框")
+            print("-" * 55)
+            input("\n准备好后按 Enter 开始...")
         
-        # 合并文件
-        merge_exports()
+        await run_export(exporter, REPORT_TABS)
     
     finally:
         await exporter.close()